@@ -12,8 +12,11 @@ This simulation generates several times linear data with random noise
 whose signal-to-noise is equal to 10 and for several given dimensions.
 
 Here we use MAPIE, with a LinearRegression base model, to estimate the width
-means and the coverage levels of the prediction intervals estimated by all the
-available strategies as function of the dataset dimension.
+means and the coverage levels of the prediction intervals estimated by the
+cross-validation strategies as function of the dataset dimension.
+The naive baseline is not computed by MAPIE: since it does not need any resampling,
+its least squares fits are solved by hand for all trials at once. It is checked
+against ``MapieRegressor(method="naive")`` on the same simulated data.
 
 We then show the prediction interval coverages and widths as a function of the
 dimension values for selected strategies with standard error given by the different trials.
@@ -22,32 +25,218 @@ This simulation is carried out to emphasize the instability of the prediction
 intervals estimated by the Jackknife strategy when the dataset dimension is
 equal to the number of training samples (here 100).
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import KFold
 from matplotlib import pyplot as plt
 
 from mapie.estimators import MapieRegressor
 from mapie.metrics import coverage_score
 
+N_TRAIN = 100
+N_TEST = 100
+SNR = 10
+
+
+def _simulate_data(
+    dimension: int,
+    trial: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate linear data with random noise whose signal-to-noise is equal to 10.
+
+    The random generator is seeded from the trial and the dimension so that
+    the same data points are regenerated in every worker, whatever the strategy.
+
+    Parameters
+    ----------
+    dimension : int
+        Dimension of input data.
+    trial : int
+        Trial identification number.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        Generated training and test data.
+        [0]: X_train
+        [1]: y_train
+        [2]: X_test
+        [3]: y_test
+    """
+    rng = np.random.default_rng(trial*100003 + dimension)
+    # All random variables are drawn at once into a single buffer, in the order
+    # beta, X_train, noise_train, noise_test, X_test, and then used as views.
+    buffer = np.empty(dimension + (N_TRAIN + N_TEST)*(dimension + 1))
+    rng.standard_normal(out=buffer)
+    sections = np.cumsum([dimension, N_TRAIN*dimension, N_TRAIN, N_TEST])
+    beta, X_train, y_train, y_test, X_test = np.split(buffer, sections)
+    X_train = X_train.reshape(N_TRAIN, dimension)
+    X_test = X_test.reshape(N_TEST, dimension)
+    beta *= np.sqrt(SNR/np.einsum("i,i->", beta, beta))
+    # the noise views are turned into the targets in place
+    y_train += X_train @ beta
+    y_test += X_test @ beta
+    return X_train, y_train, X_test, y_test
+
+
+def _one_trial(
+    strategies: Dict[str, Any],
+    alpha: float,
+    dimension: int,
+    trial: int
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Estimate the prediction intervals of all strategies on one simulated dataset.
+
+    Out-of-fold models and residuals do not depend on the method, so they are
+    fitted once for all the strategies sharing every other parameter, which then
+    only differ at prediction time.
+
+    Parameters
+    ----------
+    strategies : Dict[str, Dict[str, Any]]
+        List of strategies for estimating prediction intervals, with corresponding parameters.
+    alpha : float
+        1 - (target coverage level).
+    dimension : int
+        Dimension of input data.
+    trial : int
+        Trial identification number.
+
+    Returns
+    -------
+    Dict[str, Tuple[float, float]]
+        Coverage and mean width of the prediction intervals for each strategy.
+    """
+    X_train, y_train, X_test, y_test = _simulate_data(dimension, trial)
+    mapies: Dict[Any, MapieRegressor] = {}
+    outputs: Dict[str, Tuple[float, float]] = {}
+    for strategy, params in strategies.items():
+        params = {"alpha": alpha, "ensemble": True, **params}
+        key = tuple(sorted((k, v) for k, v in params.items() if k != "method"))
+        if key not in mapies:
+            mapies[key] = MapieRegressor(LinearRegression(), **params).fit(X_train, y_train)
+        mapie = mapies[key].set_params(method=params["method"])
+        # one contiguous array per bound rather than strided column views
+        _, y_pred_low, y_pred_up = np.ascontiguousarray(mapie.predict(X_test)[:, :, 0].T)
+        coverage = coverage_score(y_test, y_pred_low, y_pred_up)
+        width_mean = (y_pred_up - y_pred_low).mean()
+        outputs[strategy] = coverage, width_mean
+    return outputs
+
+
+def _naive_trials(
+    alpha: float,
+    dimension: int,
+    n_trial: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimate the naive prediction intervals of all trials of one dimension at once.
+
+    The naive strategy only relies on the linear regression fitted on the whole
+    training set, which is solved for all trials with a single stacked
+    pseudo-inverse of the centered data, i.e. the minimum-norm least squares
+    solution also returned by ``LinearRegression`` when dimension >= 100.
+    The agreement with ``MapieRegressor`` is verified by ``check_naive_trials``.
+    Residual quantiles and interval statistics are then reduced along the
+    sample axis for all trials together, without any loop over trials.
+
+    Parameters
+    ----------
+    alpha : float
+        1 - (target coverage level).
+    dimension : int
+        Dimension of input data.
+    n_trial : int
+        Number of trials.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Coverages and mean widths of the prediction intervals, of shapes (n_trial,).
+    """
+    # arrays of shapes (n_trial, n_samples, dimension) and (n_trial, n_samples)
+    X_train, y_train, X_test, y_test = map(np.stack, zip(*(
+        _simulate_data(dimension, trial) for trial in range(n_trial)
+    )))
+    X_mean = X_train.mean(axis=1, keepdims=True)
+    y_mean = y_train.mean(axis=1, keepdims=True)
+    # Centering makes the training data rank deficient, so singular values are
+    # cut below the usual least squares tolerance, eps*max(n_samples, dimension),
+    # rather than eps, to drop the round-off ones as LinearRegression does.
+    rcond = np.finfo(X_train.dtype).eps*max(N_TRAIN, dimension)
+    X_pinv = np.linalg.pinv(X_train - X_mean, rcond=rcond)
+    coef = np.einsum("tin,tn->ti", X_pinv, y_train - y_mean)
+    intercept = y_mean - np.einsum("tni,ti->tn", X_mean, coef)
+    y_pred_train = np.einsum("tni,ti->tn", X_train, coef) + intercept
+    y_pred_test = np.einsum("tni,ti->tn", X_test, coef) + intercept
+    # "higher" quantile of the residuals, as used by MapieRegressor for the naive method
+    residuals = np.sort(np.abs(y_train - y_pred_train), axis=1)
+    quantiles = residuals[:, [int(np.ceil((1 - alpha)*(N_TRAIN - 1)))]]
+    y_pred_low, y_pred_up = y_pred_test - quantiles, y_pred_test + quantiles
+    coverages = ((y_pred_low <= y_test) & (y_pred_up >= y_test)).mean(axis=1)
+    widths = (y_pred_up - y_pred_low).mean(axis=1)
+    return coverages, widths
+
+
+def check_naive_trials(
+    alpha: float,
+    n_trial: int,
+    dimensions: np.ndarray
+) -> None:
+    """
+    Check that the naive prediction intervals computed by hand match those
+    estimated by ``MapieRegressor(method="naive")`` on the same simulated data.
+
+    Parameters
+    ----------
+    alpha : float
+        1 - (target coverage level).
+    n_trial : int
+        Number of trials for each dimension.
+    dimensions : np.ndarray of shape (n_dimensions,)
+        Dimension values of input data.
+
+    Raises
+    ------
+    AssertionError
+        If coverages or mean widths differ.
+    """
+    for dimension in dimensions:
+        coverages, widths = _naive_trials(alpha, dimension, n_trial)
+        for trial in range(n_trial):
+            X_train, y_train, X_test, y_test = _simulate_data(dimension, trial)
+            mapie = MapieRegressor(LinearRegression(), alpha=alpha, method="naive")
+            _, y_pred_low, y_pred_up = mapie.fit(X_train, y_train).predict(X_test)[:, :, 0].T
+            np.testing.assert_allclose(coverages[trial], coverage_score(y_test, y_pred_low, y_pred_up))
+            np.testing.assert_allclose(widths[trial], (y_pred_up - y_pred_low).mean(), atol=1e-6)
+
 
 def PIs_vs_dimensions(
     strategies: Dict[str, Any],
     alpha: float,
     n_trial: int,
-    dimensions: List[int]
-) -> Dict[str, Dict[int, Dict[str, np.ndarray]]]:
+    dimensions: np.ndarray
+) -> Dict[str, np.ndarray]:
     """
     Compute the prediction intervals for a linear regression problem.
     Function adapted from Foygel-Barber et al. (2020).
 
     It generates several times linear data with random noise whose signal-to-noise
-    is equal to 10 and for several given dimensions, given by the dimensions list.
+    is equal to 10 and for several given dimensions, given by the dimensions array.
 
     Here we use MAPIE, with a LinearRegression base model, to estimate the width
-    means and the coverage levels of the prediction intervals estimated by all the
-    available strategies as a function of the dataset dimension.
+    means and the coverage levels of the prediction intervals estimated by the
+    resampling strategies as a function of the dataset dimension.
+    The naive baseline does not need any resampling and is computed by hand,
+    with ordinary least squares solved for all trials of a dimension at once.
+
+    Each (dimension, trial) simulation is independent, hence they are all
+    dispatched in parallel with joblib.
 
     This simulation is carried out to emphasize the instability of the prediction
     intervals estimated by the Jackknife strategy when the dataset dimension is
@@ -62,59 +251,56 @@ def PIs_vs_dimensions(
     n_trial : int
         Number of trials for each dimension for estimating prediction intervals.
         For each trial, a new random noise is generated.
-    dimensions : List[int]
-        List of dimension values of input data.
+    dimensions : np.ndarray of shape (n_dimensions,)
+        Dimension values of input data.
 
     Returns
     -------
-    Dict[str, Dict[int, Dict[str, np.ndarray]]]
-        Prediction interval widths and coverages for each strategy, trial,
-        and dimension value.
+    Dict[str, np.ndarray]
+        Prediction interval widths and coverages, stored under the "width_mean"
+        and "coverage" keys as arrays of shape (n_strategies, n_dimensions, n_trial).
     """
-    n_train = 100
-    n_test = 100
-    SNR = 10
-    results: Dict[str, Dict[int, Dict[str, np.ndarray]]] = {
-        strategy: {
-            dimension: {
-                "coverage": np.empty(n_trial),
-                "width_mean": np.empty(n_trial)
-            } for dimension in dimensions
-        } for strategy in strategies
+    strategy_to_i = {strategy: i for i, strategy in enumerate(strategies)}
+    dim_to_i = {dimension: i for i, dimension in enumerate(dimensions)}
+    shape = (len(strategies), len(dimensions), n_trial)
+    results = {"coverage": np.empty(shape), "width_mean": np.empty(shape)}
+    naive_strategies = [
+        strategy for strategy, params in strategies.items() if params["method"] == "naive"
+    ]
+    other_strategies = {
+        strategy: params for strategy, params in strategies.items() if params["method"] != "naive"
     }
-    for dimension in dimensions:
-        for trial in range(n_trial):
-            beta = np.random.normal(size=dimension)
-            beta_norm = np.sqrt((beta**2).sum())
-            beta = beta/beta_norm*np.sqrt(SNR)
-            X_train = np.random.normal(size=(n_train, dimension))
-            noise_train = np.random.normal(size=n_train)
-            noise_test = np.random.normal(size=n_test)
-            y_train = X_train.dot(beta) + noise_train
-            X_test = np.random.normal(size=(n_test, dimension))
-            y_test = X_test.dot(beta) + noise_test
-
-            for strategy, params in strategies.items():
-                mapie = MapieRegressor(
-                    LinearRegression(),
-                    alpha=alpha,
-                    ensemble=True,
-                    n_jobs=-1,
-                    **params
-                )
-                mapie.fit(X_train, y_train)
-                y_preds = mapie.predict(X_test)[:, :, 0]
-                results[strategy][dimension]["coverage"][trial] = coverage_score(
-                    y_test, y_preds[:, 1], y_preds[:, 2]
-                )
-                results[strategy][dimension]["width_mean"][trial] = (
-                    y_preds[:, 2] - y_preds[:, 1]
-                ).mean()
+    tasks = [
+        (dimension, trial)
+        for dimension in dimensions
+        for trial in range(n_trial)
+    ]
+    with Parallel(n_jobs=-1, prefer="processes", batch_size="auto") as parallel:
+        outputs = parallel(
+            delayed(_one_trial)(other_strategies, alpha, dimension, trial)
+            for dimension, trial in tasks
+        )
+        naive_outputs = parallel(
+            delayed(_naive_trials)(alpha, dimension, n_trial)
+            for dimension in dimensions
+        ) if naive_strategies else []
+    for (dimension, trial), output in zip(tasks, outputs):
+        for strategy, (coverage, width_mean) in output.items():
+            i, j = strategy_to_i[strategy], dim_to_i[dimension]
+            results["coverage"][i, j, trial] = coverage
+            results["width_mean"][i, j, trial] = width_mean
+    for dimension, (coverages, widths) in zip(dimensions, naive_outputs):
+        for strategy in naive_strategies:
+            i, j = strategy_to_i[strategy], dim_to_i[dimension]
+            results["coverage"][i, j] = coverages
+            results["width_mean"][i, j] = widths
     return results
 
 
 def plot_simulation_results(
-    results: Dict[str, Dict[int, Dict[str, np.ndarray]]],
+    results: Dict[str, np.ndarray],
+    strategies: List[str],
+    dimensions: np.ndarray,
     title: str
 ) -> None:
     """
@@ -123,26 +309,25 @@ def plot_simulation_results(
 
     Parameters
     ----------
-    results : Dict[str, Dict[int, Dict[str, np.ndarray]]]
-        Prediction interval widths and coverages for each strategy, trial,
-        and dimension value.
+    results : Dict[str, np.ndarray]
+        Prediction interval widths and coverages, stored under the "width_mean"
+        and "coverage" keys as arrays of shape (n_strategies, n_dimensions, n_trial).
+    strategies : List[str]
+        List of strategy names, in the order of the results first axis.
+    dimensions : np.ndarray of shape (n_dimensions,)
+        Dimension values of input data, in the order of the results second axis.
     title : str
         Title of the plot.
     """
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
-    plt.rcParams.update({"font.size": 14})
-    plt.suptitle(title)
-    for strategy in results:
-        dimensions = list(results[strategy].keys())
-        n_dim = len(dimensions)
-        coverage_mean, coverage_SE, width_mean, width_SE = (
-            np.zeros(n_dim), np.zeros(n_dim), np.zeros(n_dim), np.zeros(n_dim)
-        )
-        for idim, dimension in enumerate(dimensions):
-            coverage_mean[idim] = results[strategy][dimension]["coverage"].mean()
-            coverage_SE[idim] = results[strategy][dimension]["coverage"].std()/np.sqrt(ntrial)
-            width_mean[idim] = results[strategy][dimension]["width_mean"].mean()
-            width_SE[idim] = results[strategy][dimension]["width_mean"].std()/np.sqrt(ntrial)
+    # "large" title and "medium" legends relative to a 14pt font, without touching rcParams
+    plt.suptitle(title, fontsize=16.8)
+    n_trial = results["coverage"].shape[2]
+    for i, strategy in enumerate(strategies):
+        coverage_mean = results["coverage"][i].mean(axis=1)
+        coverage_SE = results["coverage"][i].std(axis=1)/np.sqrt(n_trial)
+        width_mean = results["width_mean"][i].mean(axis=1)
+        width_SE = results["width_mean"][i].std(axis=1)/np.sqrt(n_trial)
         ax1.plot(dimensions, coverage_mean, label=strategy)
         ax1.fill_between(
             dimensions, coverage_mean - coverage_SE, coverage_mean + coverage_SE, alpha=0.25
@@ -155,20 +340,26 @@ def plot_simulation_results(
     ax1.set_ylim(0.0, 1.0)
     ax1.set_xlabel("Dimension d")
     ax1.set_ylabel("Coverage")
-    ax1.legend()
+    ax1.legend(fontsize=14)
     ax2.set_ylim(0, 20)
     ax2.set_xlabel("Dimension d")
     ax2.set_ylabel("Interval width")
-    ax2.legend()
+    ax2.legend(fontsize=14)
 
 
+# The number of training samples is fixed, so a single cross-validator is
+# built once and shared by all strategies and simulations.
+KFOLD = KFold(n_splits=5)
 STRATEGIES = {
     "naive": dict(method="naive"),
-    "cv": dict(method="base", cv=5),
-    "cv_plus": dict(method="plus", cv=5)
+    "cv": dict(method="base", cv=KFOLD),
+    "cv_plus": dict(method="plus", cv=KFOLD)
 }
 alpha = 0.1
 ntrial = 3
 dimensions = np.arange(10, 150, 10)
+check_naive_trials(alpha, ntrial, dimensions)
 results = PIs_vs_dimensions(STRATEGIES, alpha, ntrial, dimensions)
-plot_simulation_results(results, title="Coverages and interval widths")
+plot_simulation_results(
+    results, list(STRATEGIES), dimensions, title="Coverages and interval widths"
+)
@@ -13,16 +13,19 @@ from typing_extensions import TypedDict
 import numpy as np
 import scipy
 from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import BaseCrossValidator, KFold, LeaveOneOut
 from matplotlib import pyplot as plt
+from matplotlib.collections import PolyCollection
+from matplotlib.lines import Line2D
 
 from mapie.estimators import MapieRegressor
 
 
 def f(x: np.ndarray) -> np.ndarray:
     """Polynomial function used to generate one-dimensional data"""
-    return np.stack(5*x + 5*x**4 - 9*x**2)
+    # Horner form of 5*x - 9*x**2 + 5*x**4
+    return np.asarray(x*(5 + x*(-9 + 5*x*x)))
 
 
 def get_homoscedastic_data(
@@ -55,31 +58,28 @@ def get_homoscedastic_data(
         [3]: y_true
         [4]: y_true_sigma
     """
-    np.random.seed(59)
+    rng = np.random.default_rng(59)
     q95 = scipy.stats.norm.ppf(0.95)
-    X_train = np.random.exponential(0.4, n_samples)
-    X_true = np.linspace(0.001, 1.2, n_test, endpoint=False)
-    y_train = f(X_train) + np.random.normal(0, sigma, n_samples)
+    X_train = rng.exponential(0.4, n_samples).astype(np.float32)
+    X_true = np.linspace(0.001, 1.2, n_test, endpoint=False, dtype=np.float32)
+    y_train = f(X_train)
+    y_train += np.float32(sigma)*rng.standard_normal(n_samples, dtype=np.float32)
     y_true = f(X_true)
     y_true_sigma = q95*sigma
     return X_train, y_train, X_true, y_true, y_true_sigma
 
 
-def plot_1d_data(
+def init_axes(
     X_train: np.ndarray,
     y_train: np.ndarray,
     X_test: np.ndarray,
     y_test: np.ndarray,
     y_test_sigma: float,
-    y_pred: np.ndarray,
-    y_pred_low: np.ndarray,
-    y_pred_up: np.ndarray,
-    ax: plt.Axes,
-    title: str
-) -> None:
+    ax: plt.Axes
+) -> Tuple[Line2D, PolyCollection]:
     """
-    Generate a figure showing the training data and estimated
-    prediction intervals on test data.
+    Draw the training data and the true confidence intervals on test data,
+    and create the prediction artists to be filled in by ``update_axes``.
 
     Parameters
     ----------
@@ -93,16 +93,13 @@ def plot_1d_data(
         True function values on test data.
     y_test_sigma : float
         True standard deviation.
-    y_pred : np.ndarray
-        Predictions on test data.
-    y_pred_low : np.ndarray
-        Predicted lower bounds on test data.
-    y_pred_up : np.ndarray
-        Predicted upper bounds on test data.
     ax : plt.Axes
         Axis to plot.
-    title : str
-        Title of the figure.
+
+    Returns
+    -------
+    Tuple[Line2D, PolyCollection]
+        Artists of the predictions and of the prediction intervals.
     """
     ax.set_xlabel("x")
     ax.set_ylabel("y")
@@ -112,53 +109,78 @@ def plot_1d_data(
     ax.plot(X_test, y_test, color="gray", label="True confidence intervals")
     ax.plot(X_test, y_test - y_test_sigma, color="gray", ls="--")
     ax.plot(X_test, y_test + y_test_sigma, color="gray", ls="--")
-    ax.plot(X_test, y_pred, label="Prediction intervals")
-    ax.fill_between(X_test, y_pred_low, y_pred_up, alpha=0.3)
-    ax.set_title(title)
+    (line,) = ax.plot(X_test, y_test, label="Prediction intervals")
+    poly = ax.fill_between(X_test, y_test, y_test, alpha=0.3)
     ax.legend()
+    return line, poly
+
+
+def update_axes(
+    artists: Tuple[Line2D, PolyCollection],
+    X_test: np.ndarray,
+    y_pred: np.ndarray,
+    y_pred_low: np.ndarray,
+    y_pred_up: np.ndarray
+) -> None:
+    """
+    Update the prediction artists created by ``init_axes``
+    with estimated prediction intervals on test data.
+
+    Parameters
+    ----------
+    artists : Tuple[Line2D, PolyCollection]
+        Artists of the predictions and of the prediction intervals.
+    X_test : np.ndarray
+        Test data.
+    y_pred : np.ndarray
+        Predictions on test data.
+    y_pred_low : np.ndarray
+        Predicted lower bounds on test data.
+    y_pred_up : np.ndarray
+        Predicted upper bounds on test data.
+    """
+    line, poly = artists
+    line.set_ydata(y_pred)
+    # closed polygon going along the lower bounds and back along the upper bounds
+    poly.set_verts([np.column_stack([
+        np.concatenate([X_test, X_test[::-1]]),
+        np.concatenate([y_pred_low, y_pred_up[::-1]])
+    ])])
 
 
 X_train, y_train, X_test, y_test, y_test_sigma = get_homoscedastic_data(
     n_samples=200, n_test=200, sigma=0.1
 )
 
-polyn_model = Pipeline(
-    [
-        ("poly", PolynomialFeatures(degree=4)),
-        ("linear", LinearRegression(fit_intercept=False))
-    ]
-)
+# The polynomial expansion is row-wise, hence it is computed once for all
+# strategies and out-of-fold models instead of being refitted in a pipeline.
+poly = PolynomialFeatures(degree=4).fit(X_train.reshape(-1, 1))
+X_train_poly = poly.transform(X_train.reshape(-1, 1))
+X_test_poly = poly.transform(X_test.reshape(-1, 1))
 
-Params = TypedDict("Params", {"method": str, "cv": int})
+# Cross-validators are built once and shared by all strategies.
+LOO = LeaveOneOut()
+KFOLD = KFold(n_splits=10)
+Params = TypedDict("Params", {"method": str, "cv": BaseCrossValidator})
 STRATEGIES = {
-    "jackknife": Params(method="base", cv=-1),
-    "jackknife_plus": Params(method="plus", cv=-1),
-    "jackknife_minmax": Params(method="minmax", cv=-1),
-    "cv": Params(method="base", cv=10),
-    "cv_plus": Params(method="plus", cv=10),
-    "cv_minmax": Params(method="minmax", cv=10),
+    "jackknife": Params(method="base", cv=LOO),
+    "jackknife_plus": Params(method="plus", cv=LOO),
+    "jackknife_minmax": Params(method="minmax", cv=LOO),
+    "cv": Params(method="base", cv=KFOLD),
+    "cv_plus": Params(method="plus", cv=KFOLD),
+    "cv_minmax": Params(method="minmax", cv=KFOLD),
 }
-fig, ((ax1, ax2, ax3), (ax4, ax5, ax6)) = plt.subplots(2, 3, figsize=(3*6, 12))
-axs = [ax1, ax2, ax3, ax4, ax5, ax6]
-for i, (strategy, params) in enumerate(STRATEGIES.items()):
+fig, axs = plt.subplots(2, 3, figsize=(3*6, 12))
+axs_artists = [init_axes(X_train, y_train, X_test, y_test, y_test_sigma, ax) for ax in axs.flat]
+for (strategy, params), ax, artists in zip(STRATEGIES.items(), axs.flat, axs_artists):
     mapie = MapieRegressor(
-        polyn_model,
+        LinearRegression(fit_intercept=False),
         alpha=0.05,
         ensemble=True,
         n_jobs=-1,
         **params
     )
-    mapie.fit(X_train.reshape(-1, 1), y_train)
-    y_preds = mapie.predict(X_test.reshape(-1, 1))[:, :, 0]
-    plot_1d_data(
-        X_train,
-        y_train,
-        X_test,
-        y_test,
-        y_test_sigma,
-        y_preds[:, 0],
-        y_preds[:, 1],
-        y_preds[:, 2],
-        axs[i],
-        strategy
-    )
+    mapie.fit(X_train_poly, y_train)
+    y_pred, y_pred_low, y_pred_up = np.ascontiguousarray(mapie.predict(X_test_poly)[:, :, 0].T)
+    update_axes(artists, X_test, y_pred, y_pred_low, y_pred_up)
+    ax.set_title(strategy)
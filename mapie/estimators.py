@@ -347,7 +347,7 @@ class MapieRegressor(BaseEstimator, RegressorMixin):  # type: ignore
         self._check_parameters()
         cv = self._check_cv(self.cv)
         estimator = self._check_estimator(self.estimator)
-        X, y = check_X_y(X, y, force_all_finite=False, dtype=["float64", "object"])
+        X, y = check_X_y(X, y, force_all_finite=False, dtype=["float64", "float32", "object"])
         y_pred = np.empty_like(y, dtype=float)
         self.estimators_: List[RegressorMixin] = []
         self.n_features_in_ = X.shape[1]
@@ -392,7 +392,7 @@ class MapieRegressor(BaseEstimator, RegressorMixin):  # type: ignore
             - [:, 2, :]: Upper bound of the prediction interval
         """
         check_is_fitted(self, ["single_estimator_", "estimators_", "k_", "residuals_"])
-        X = check_array(X, force_all_finite=False, dtype=["float64", "object"])
+        X = check_array(X, force_all_finite=False, dtype=["float64", "float32", "object"])
         y_pred = self.single_estimator_.predict(X)
         alpha = self._check_alpha(self.alpha)
         if self.method in ["naive", "base"]:
@@ -354,3 +354,14 @@ def test_results_single_and_multi_jobs(strategy: str) -> None:
     y_preds_single = mapie_single.predict(X_toy)
     y_preds_multi = mapie_multi.predict(X_toy)
     np.testing.assert_almost_equal(y_preds_single, y_preds_multi)
+
+
+@pytest.mark.parametrize("strategy", [*STRATEGIES])
+def test_results_float32_input(strategy: str) -> None:
+    """Test that float32 inputs are not upcast and give results close to float64 inputs."""
+    mapie_64 = MapieRegressor(**STRATEGIES[strategy])
+    y_preds_64 = mapie_64.fit(X_reg, y_reg).predict(X_reg)
+    mapie_32 = MapieRegressor(**STRATEGIES[strategy])
+    y_preds_32 = mapie_32.fit(X_reg.astype(np.float32), y_reg).predict(X_reg.astype(np.float32))
+    assert mapie_32.single_estimator_.coef_.dtype == np.float32
+    np.testing.assert_almost_equal(y_preds_32, y_preds_64, 2)